@@ -1,12 +1,29 @@
 import os
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import re
+import sqlite3
+import string
+import threading
+import time
+import httpx
+import numpy as np
 import streamlit as st
 import openai
 import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from contextlib import closing, nullcontext
 from datetime import datetime
+from functools import wraps
 
 # Try importing jira, with graceful fallback if not installed
 try:
     from jira import JIRA
+    from jira.resources import Issue
 
     JIRA_AVAILABLE = True
 except ImportError:
@@ -27,10 +44,14 @@ if not JIRA_AVAILABLE:
     """)
 
 # Application state
-if 'generated_test_cases' not in st.session_state:
-    st.session_state.generated_test_cases = {}
 if 'fetched_tickets' not in st.session_state:
     st.session_state.fetched_tickets = []
+if 'tickets_df' not in st.session_state:
+    st.session_state.tickets_df = None
+if 'batch_progress' not in st.session_state:
+    st.session_state.batch_progress = None
+if 'last_batch_summary' not in st.session_state:
+    st.session_state.last_batch_summary = []
 
 # Load environment variables if available
 default_jira_url = os.environ.get("JIRA_URL", "")
@@ -38,6 +59,78 @@ default_jira_email = os.environ.get("JIRA_EMAIL", "")
 default_jira_project = os.environ.get("JIRA_PROJECT", "")
 default_openai_api_key = os.environ.get("OPENAI_API_KEY", "")
 
+# Generated test cases are cached on disk so unchanged tickets are not re-sent to OpenAI
+CACHE_DB_PATH = os.environ.get("TEST_CASE_CACHE_DB", ".tc_cache.sqlite3")
+
+# Near-duplicate tickets reuse cached test cases when their embeddings are similar enough
+EMBEDDINGS_PATH = os.environ.get("TEST_CASE_EMBEDDINGS", ".tc_embeddings.npz")
+EMBEDDING_MODEL = "text-embedding-3-small"
+SIMILARITY_THRESHOLD = 0.93
+
+# Number of tickets sent to OpenAI at the same time in batch processing
+BATCH_MAX_WORKERS = 8
+
+# Seconds between progress repaints while a batch runs in the background
+BATCH_POLL_INTERVAL = 0.5
+
+# Number of concurrent Jira requests; the connection pool is sized to match
+JIRA_MAX_WORKERS = 16
+
+# Fetched ticket lists only need the columns shown in the Fetch Tickets tab
+TICKET_LIST_FIELDS = "summary,issuetype,status,priority"
+JIRA_PAGE_SIZE = 100
+
+# Fields used when generating test cases; the acceptance criteria field is appended per server
+TICKET_DETAIL_FIELDS = "summary,description,status,issuetype,priority,components,created,updated"
+_ACCEPT_RE = re.compile(r'accept', re.IGNORECASE)
+
+
+# Prompt sent for every ticket; the role is given once in the system message
+SYSTEM_MESSAGE = "QA expert; output markdown."
+TEST_CASE_PROMPT = string.Template("""Based on the following Jira ticket details, generate a comprehensive set of test cases.
+
+TICKET KEY: $key
+SUMMARY: $summary
+DESCRIPTION: $description
+ISSUE TYPE: $issue_type
+PRIORITY: $priority
+COMPONENTS: $components
+ACCEPTANCE CRITERIA: $acceptance_criteria
+
+For each test case, provide:
+1. Test case ID (TC-XX format)
+2. Test objective
+3. Preconditions
+4. Test steps (numbered)
+5. Expected results
+6. Priority (High/Medium/Low)
+
+Cover the following:
+- Positive test cases (valid inputs/scenarios)
+- Negative test cases (invalid inputs/error handling)
+- Edge cases and boundary values
+- Performance considerations (if applicable)
+- Security aspects (if applicable)
+- Integration points with other components
+
+Format the test cases clearly with proper categorization.
+""")
+
+
+# Defined ahead of the sidebar, which uses it for the connection test
+@st.cache_resource
+def _jira_client(jira_url, jira_email, jira_api_token):
+    """Create a Jira client once per set of credentials and reuse its pooled session"""
+    jira = JIRA(server=jira_url, basic_auth=(jira_email, jira_api_token))
+
+    # Keep enough pooled connections open for concurrent ticket requests
+    adapter = HTTPAdapter(pool_connections=2 * JIRA_MAX_WORKERS, pool_maxsize=4 * JIRA_MAX_WORKERS,
+                          max_retries=Retry(total=3, backoff_factor=0.2))
+    jira._session.mount("https://", adapter)
+    jira._session.mount("http://", adapter)
+    return jira
+
+
 # Sidebar for configuration
 with st.sidebar:
     st.header("Configuration")
@@ -72,7 +165,7 @@ with st.sidebar:
             st.error("Please fill all Jira connection fields")
         else:
             try:
-                jira = JIRA(server=jira_url, basic_auth=(jira_email, jira_api_token))
+                jira = _jira_client(jira_url, jira_email, jira_api_token)
                 myself = jira.myself()
                 st.success(f"Connection successful! Connected as {myself['displayName']}")
             except Exception as e:
@@ -91,12 +184,75 @@ def connect_to_jira(jira_url, jira_email, jira_api_token):
         return None
 
     try:
-        return JIRA(server=jira_url, basic_auth=(jira_email, jira_api_token))
+        return _jira_client(jira_url, jira_email, jira_api_token)
     except Exception as e:
         st.error(f"Failed to connect to Jira: {str(e)}")
         return None
 
 
+@st.cache_data(ttl=60, show_spinner=False)
+def _jira_ready(jira_url, jira_email, jira_api_token):
+    """Check the Jira credentials, remembering the answer for a minute so reruns skip the round-trip"""
+    try:
+        _jira_client(jira_url, jira_email, jira_api_token).myself()
+        return True
+    except Exception:
+        return False
+
+
+def _jira_async_http(jira):
+    """Async HTTP client for the Jira REST endpoints, using the same server and credentials as jira"""
+    return httpx.AsyncClient(
+        base_url=jira.server_url,
+        auth=jira._session.auth,
+        headers={"Accept": "application/json"},
+        limits=httpx.Limits(max_connections=JIRA_MAX_WORKERS),
+        # Requests queue for a pooled connection, so only time out on the request itself
+        timeout=httpx.Timeout(30, pool=None)
+    )
+
+
+async def search_issues_async(http, query, start_at, max_results):
+    """Fetch one page of a JQL search as raw JSON (Server/Data Center)"""
+    response = await http.get("/rest/api/2/search", params={
+        "jql": query,
+        "startAt": start_at,
+        "maxResults": max_results,
+        "fields": TICKET_LIST_FIELDS
+    })
+    response.raise_for_status()
+    return response.json()
+
+
+async def search_issues_cloud_async(http, query, max_results):
+    """Fetch up to max_results raw issues from a Jira Cloud JQL search
+
+    Cloud pages are chained by nextPageToken, so they are fetched one after another.
+    """
+    issues = []
+    next_page_token = None
+
+    while len(issues) < max_results:
+        params = {
+            "jql": query,
+            "maxResults": min(JIRA_PAGE_SIZE, max_results - len(issues)),
+            "fields": TICKET_LIST_FIELDS
+        }
+        if next_page_token:
+            params["nextPageToken"] = next_page_token
+
+        response = await http.get("/rest/api/3/search/jql", params=params)
+        response.raise_for_status()
+        page = response.json()
+
+        issues.extend(page['issues'])
+        next_page_token = page.get('nextPageToken')
+        if not next_page_token or not page['issues']:
+            break
+
+    return issues
+
+
 def fetch_jira_tickets(jira, project_key, status=None, max_results=50):
     """Fetch tickets from specified Jira project"""
     if not project_key:
@@ -108,117 +264,714 @@ def fetch_jira_tickets(jira, project_key, status=None, max_results=50):
     if status and status != "All":
         query += f" AND status = '{status}'"
 
+    async def run():
+        async with _jira_async_http(jira) as http:
+            # Jira Cloud has retired offset paging, so only fetch pages in parallel on Server/Data Center
+            if jira._is_cloud:
+                return await search_issues_cloud_async(http, query, max_results)
+
+            # The first page also reports the total and the page size the server allows
+            first_page = await search_issues_async(http, query, 0, min(max_results, JIRA_PAGE_SIZE))
+            limit = min(first_page['total'], max_results)
+            page_size = first_page['maxResults'] or JIRA_PAGE_SIZE
+
+            pages = await asyncio.gather(*(
+                search_issues_async(http, query, start_at, min(page_size, limit - start_at))
+                for start_at in range(len(first_page['issues']), limit, page_size)
+            ))
+
+        return [raw for page in (first_page, *pages) for raw in page['issues']]
+
     try:
-        issues = jira.search_issues(query, maxResults=max_results)
-        return issues
+        issues = asyncio.run(run())
     except Exception as e:
         st.error(f"Error fetching tickets: {str(e)}")
         return []
 
+    # Wrap the raw JSON in jira resources so the rest of the app can use issue.fields as usual
+    return [Issue(jira._options, jira._session, raw=raw) for raw in issues]
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _jira_field_map(jira_url, jira_email, jira_api_token):
+    """Map lower-cased Jira field names to field IDs, refreshed hourly per server"""
+    jira = _jira_client(jira_url, jira_email, jira_api_token)
+    return {f['name'].lower(): f['id'] for f in jira.fields()}
+
+
+def find_acceptance_criteria_field(jira_url, jira_email, jira_api_token):
+    """Look up the ID of the acceptance criteria custom field"""
+    try:
+        field_map = _jira_field_map(jira_url, jira_email, jira_api_token)
+    except Exception as e:
+        st.warning(f"Could not look up the acceptance criteria field: {str(e)}")
+        return None
+
+    # This is tricky because custom fields vary between Jira instances, so fall back to a partial name match
+    if 'acceptance criteria' in field_map:
+        return field_map['acceptance criteria']
+    return next((field_id for name, field_id in field_map.items() if _ACCEPT_RE.search(name)), None)
+
+
+def _ticket_details_from_raw(raw, ac_field_id=None):
+    """Extract the fields used for test generation from a raw Jira issue"""
+    # All fields were requested explicitly, so they can be read directly; priority and
+    # components are left out of the response when the project has them disabled
+    fields = raw['fields']
+    priority = fields.get('priority')
+    components = fields.get('components') or []
+    acceptance_criteria = fields.get(ac_field_id) if ac_field_id else None
+
+    return {
+        'key': raw['key'],
+        'summary': fields['summary'],
+        'description': fields['description'] or "No description provided",
+        'status': fields['status']['name'],
+        'issue_type': fields['issuetype']['name'],
+        'priority': priority['name'] if priority else "Not set",
+        'components': [c['name'] for c in components],
+        'created': fields['created'],
+        'updated': fields['updated'],
+        'acceptance_criteria': acceptance_criteria or "No acceptance criteria provided"
+    }
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_ticket_details(_jira, server_url, jira_email, token_hash, issue_key, ac_field_id):
+    """Fetch and extract ticket fields, cached for a few minutes per server, user and ticket
+
+    The cache is shared by all sessions, so the caller's credentials are part of the key.
+    Errors are raised rather than reported so that a failed fetch is never cached.
+    """
+    requested_fields = TICKET_DETAIL_FIELDS + (f",{ac_field_id}" if ac_field_id else "")
+    issue = _jira.issue(issue_key, fields=requested_fields)
+    return _ticket_details_from_raw(issue.raw, ac_field_id)
+
 
-def get_ticket_details(jira, issue_key):
+async def fetch_ticket_details_async(http, issue_key, ac_field_id=None):
+    """Fetch and extract ticket fields over an async Jira HTTP client"""
+    requested_fields = TICKET_DETAIL_FIELDS + (f",{ac_field_id}" if ac_field_id else "")
+    response = await http.get(f"/rest/api/2/issue/{issue_key}", params={"fields": requested_fields})
+    response.raise_for_status()
+    return _ticket_details_from_raw(response.json(), ac_field_id)
+
+
+def get_ticket_details(jira, issue_key, ac_field_id=None):
     """Get detailed information for a specific ticket"""
+    jira_email, jira_api_token = jira._session.auth
+    token_hash = hashlib.sha256(jira_api_token.encode()).hexdigest()
+
     try:
-        issue = jira.issue(issue_key)
-
-        # Extract fields
-        details = {
-            'key': issue.key,
-            'summary': issue.fields.summary,
-            'description': issue.fields.description or "No description provided",
-            'status': issue.fields.status.name,
-            'issue_type': issue.fields.issuetype.name,
-            'priority': issue.fields.priority.name if hasattr(issue.fields,
-                                                              'priority') and issue.fields.priority else "Not set",
-            'components': [c.name for c in issue.fields.components] if hasattr(issue.fields, 'components') else [],
-            'created': issue.fields.created,
-            'updated': issue.fields.updated
+        return _fetch_ticket_details(jira, jira.server_url, jira_email, token_hash, issue_key, ac_field_id)
+    except Exception as e:
+        st.error(f"Error fetching ticket details: {str(e)}")
+        return None
+
+
+def build_tickets_dataframe(tickets):
+    """Table of fetched tickets shown in the Fetch Tickets tab"""
+    ticket_data = []
+
+    for issue in tickets:
+        priority = getattr(issue.fields, 'priority', None)
+        ticket_data.append({
+            "Key": issue.key,
+            "Summary": issue.fields.summary,
+            "Type": issue.fields.issuetype.name,
+            "Status": issue.fields.status.name,
+            "Priority": priority.name if priority else "Not set"
+        })
+
+    return pd.DataFrame(ticket_data)
+
+
+def parse_batch_descriptions(batch_descriptions):
+    """Parse "TicketID | Summary | Description" lines into ticket details, skipping incomplete lines"""
+    # Lines need all three parts, though any of them may be empty
+    lines = pd.Series(batch_descriptions.splitlines(), dtype=str)
+    lines = lines[lines.str.count(r'\|') >= 2]
+    if lines.empty:
+        return []
+
+    df = pd.read_csv(io.StringIO("\n".join(lines)), sep='|', header=None,
+                     names=['key', 'summary', 'description'], usecols=range(3), dtype=str,
+                     quoting=csv.QUOTE_NONE, na_filter=False, engine='c')
+
+    for column in df.columns:
+        df[column] = df[column].str.strip()
+
+    return [
+        {
+            'key': row.key,
+            'summary': row.summary,
+            'description': row.description,
+            'issue_type': "Story",
+            'priority': "Medium",
+            'components': [],
+            'acceptance_criteria': "Not provided"
         }
+        for row in df.itertuples(index=False)
+    ]
 
-        # Try to get acceptance criteria if it exists (custom field)
-        # This is tricky because custom fields vary between Jira instances
-        acceptance_criteria = "No acceptance criteria provided"
 
-        # Try common custom field names for acceptance criteria
-        custom_field_names = ['customfield_10000', 'customfield_10001', 'customfield_10002',
-                              'customfield_10003', 'customfield_10004', 'customfield_10005']
+def get_ticket_details_concurrently(jira, issue_keys, ac_field_id=None):
+    """Fetch details for several tickets concurrently, skipping any that fail"""
+    async def run():
+        async with _jira_async_http(jira) as http:
+            return await asyncio.gather(*(fetch_ticket_details_async(http, issue_key, ac_field_id)
+                                          for issue_key in issue_keys), return_exceptions=True)
+
+    tickets = []
+    for issue_key, details in zip(issue_keys, asyncio.run(run())):
+        if isinstance(details, Exception):
+            st.error(f"Error fetching ticket details for {issue_key}: {str(details)}")
+        else:
+            tickets.append(details)
+
+    return tickets
+
+
+@st.cache_resource
+def _openai_client(openai_api_key):
+    """Create one OpenAI client per API key so its connection pool is reused across calls"""
+    return openai.OpenAI(api_key=openai_api_key, http_client=httpx.Client(
+        limits=httpx.Limits(max_connections=4 * BATCH_MAX_WORKERS, max_keepalive_connections=2 * BATCH_MAX_WORKERS)))
+
+
+def _async_openai_client(openai_api_key):
+    """Create an AsyncOpenAI client whose pool fits all concurrent batch requests
+
+    Async connections are bound to the event loop that opened them, so one client is
+    created per run and shared by every request in it rather than cached globally.
+    """
+    return openai.AsyncOpenAI(api_key=openai_api_key, http_client=httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=4 * BATCH_MAX_WORKERS, max_keepalive_connections=2 * BATCH_MAX_WORKERS)))
+
+
+def open_cache_db():
+    """Open the on-disk test case cache, creating the table on first use"""
+    conn = sqlite3.connect(CACHE_DB_PATH)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS completions "
+        "(key TEXT PRIMARY KEY, model TEXT, created REAL, content TEXT)"
+    )
+    # Ticket keys are only unique per Jira server, and test cases are only shown to the user
+    # who generated them; manual tickets are stored with an empty server
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS ticket_test_cases "
+        "(jira_server TEXT, jira_email TEXT, ticket_key TEXT, updated REAL, content TEXT, "
+        "PRIMARY KEY (jira_server, jira_email, ticket_key))"
+    )
+    # Submitted Batch API jobs, kept until they reach a terminal state
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS batch_jobs "
+        "(id TEXT PRIMARY KEY, model TEXT, cache_keys TEXT, status TEXT, jira_server TEXT, jira_email TEXT, "
+        "key_hash TEXT)"
+    )
+    # Rows of the embeddings matrix on disk, one per cached ticket
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS similar_tickets "
+        "(row INTEGER PRIMARY KEY, model TEXT, issue_type TEXT, content TEXT)"
+    )
+    return conn
+
+
+def load_generated_test_cases(jira_server, jira_email):
+    """Load the latest test cases generated for each ticket on a Jira connection, kept across app restarts
+
+    Manual tickets of the same user are included; a Jira ticket wins over a manual one with the same key.
+    """
+    with closing(open_cache_db()) as conn:
+        return dict(conn.execute(
+            "SELECT ticket_key, content FROM ticket_test_cases "
+            "WHERE jira_email = ? AND jira_server IN ('', ?) ORDER BY jira_server",
+            (jira_email, jira_server)
+        ))
+
+
+def test_cases_scope(manual=False):
+    """Jira server and email that this session's test cases are stored under"""
+    jira_server, jira_email = st.session_state.test_cases_scope
+    return ("" if manual else jira_server), jira_email
+
+
+def store_test_cases(ticket_key, test_cases, scope):
+    """Record the test cases generated for a ticket in the session and on disk"""
+    st.session_state.generated_test_cases[ticket_key] = test_cases
+    save_generated_test_cases(scope, ticket_key, test_cases)
+
+
+def save_generated_test_cases(scope, ticket_key, test_cases):
+    """Write the test cases generated for a ticket to disk under a (jira_server, jira_email) scope"""
+    with closing(open_cache_db()) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO ticket_test_cases (jira_server, jira_email, ticket_key, updated, content) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (*scope, ticket_key, time.time(), test_cases)
+        )
+
+
+def openai_key_hash(openai_api_key):
+    """Identify an OpenAI API key without storing it"""
+    return hashlib.sha256(openai_api_key.encode()).hexdigest()
+
+
+def load_batch_jobs(key_hash):
+    """Load the Batch API jobs submitted with an OpenAI key that have not been collected yet
+
+    Jobs are kept across app restarts; only the key that submitted a job can retrieve it.
+    """
+    with closing(open_cache_db()) as conn:
+        rows = conn.execute(
+            "SELECT id, model, cache_keys, status, jira_server, jira_email FROM batch_jobs WHERE key_hash = ?",
+            (key_hash,)
+        ).fetchall()
+    return [{'id': job_id, 'model': model, 'cache_keys': json.loads(cache_keys), 'status': status,
+             'scope': (jira_server, jira_email), 'key_hash': key_hash}
+            for job_id, model, cache_keys, status, jira_server, jira_email in rows]
+
+
+def save_batch_job(job):
+    """Write a Batch API job and its latest status to disk"""
+    with closing(open_cache_db()) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO batch_jobs (id, model, cache_keys, status, jira_server, jira_email, key_hash) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job['id'], job['model'], json.dumps(job['cache_keys']), job['status'], *job['scope'], job['key_hash'])
+        )
+
+
+def delete_batch_job(job_id):
+    """Forget a Batch API job once it has reached a terminal state"""
+    with closing(open_cache_db()) as conn, conn:
+        conn.execute("DELETE FROM batch_jobs WHERE id = ?", (job_id,))
+
+
+def completion_cache_key(model, prompt):
+    """Cache key for a completion: hash of the model and the exact messages sent"""
+    return hashlib.sha256((model + '|' + json.dumps(build_messages(prompt))).encode()).hexdigest()
+
+
+def load_cached_completion(key):
+    """Return the cached completion for a key, or None if it was never generated"""
+    with closing(open_cache_db()) as conn:
+        row = conn.execute("SELECT content FROM completions WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def save_cached_completion(key, model, content):
+    """Store a completion in the on-disk cache"""
+    with closing(open_cache_db()) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO completions (key, model, created, content) VALUES (?, ?, ?, ?)",
+            (key, model, time.time(), content)
+        )
 
-        for field_name in custom_field_names:
-            try:
-                value = getattr(issue.fields, field_name, None)
-                if value and (isinstance(value, str) and 'accept' in value.lower()):
-                    acceptance_criteria = value
-                    break
-            except:
-                pass
 
-        details['acceptance_criteria'] = acceptance_criteria
+def cache_completion(func):
+    """Serve completions for a previously seen (model, prompt) pair from the on-disk cache"""
 
-        return details
+    @wraps(func)
+    async def wrapper(client, model, prompt, placeholder=None):
+        key = completion_cache_key(model, prompt)
+
+        cached = load_cached_completion(key)
+        if cached is not None:
+            return cached
+
+        content = await func(client, model, prompt, placeholder)
+        if content:
+            save_cached_completion(key, model, content)
+        return content
+
+    return wrapper
+
+
+@st.cache_resource
+def embeddings_lock():
+    """Lock serialising writes to the embeddings matrix across sessions"""
+    return threading.Lock()
+
+
+def quantize(vectors):
+    """Quantize float vectors to int8 with one scale per row, so vectors ~= q * scale"""
+    vectors = np.atleast_2d(vectors)
+    scales = np.abs(vectors).max(axis=1) / 127
+    quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def load_embeddings():
+    """Load the int8 (N, dim) matrix of cached ticket embeddings and its per-row scales"""
+    if not os.path.exists(EMBEDDINGS_PATH):
+        return None, None
+    with np.load(EMBEDDINGS_PATH) as data:
+        return data['vectors'], data['scales']
+
+
+async def embed_ticket(client, ticket_details):
+    """Embed the ticket text as a unit-length vector"""
+    text = "\n".join([ticket_details['summary'], ticket_details['description'],
+                      ticket_details['acceptance_criteria']])
+
+    response = await client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+
+    vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def find_similar_test_cases(embedding, model, issue_type):
+    """Return test cases cached for a near-duplicate ticket of the same type, if any"""
+    vectors, scales = load_embeddings()
+    if vectors is None:
+        return None
+
+    # Only compare against tickets of the same type to avoid false positives
+    with closing(open_cache_db()) as conn:
+        candidates = conn.execute(
+            "SELECT row, content FROM similar_tickets WHERE model = ? AND issue_type = ? AND row < ?",
+            (model, issue_type, len(vectors))
+        ).fetchall()
+    if not candidates:
+        return None
+
+    # Integer dot products, rescaled to approximate cosine similarity
+    query, query_scale = quantize(embedding)
+    rows = np.array([row for row, _ in candidates])
+    similarities = (vectors[rows].astype(np.int32) @ query[0].astype(np.int32)) * (scales[rows] * query_scale[0])
+    best = int(np.argmax(similarities))
+
+    if similarities[best] > SIMILARITY_THRESHOLD:
+        return candidates[best][1]
+    return None
+
+
+def remember_similar_test_cases(embedding, model, issue_type, test_cases):
+    """Append the ticket embedding and its test cases to the semantic cache"""
+    with embeddings_lock():
+        vectors, scales = load_embeddings()
+        quantized, scale = quantize(embedding)
+        row = 0 if vectors is None else len(vectors)
+        if vectors is not None:
+            quantized = np.vstack([vectors, quantized])
+            scale = np.concatenate([scales, scale])
+
+        # Write to a temporary file first so readers never see a partial matrix
+        tmp_path = EMBEDDINGS_PATH + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, vectors=quantized, scales=scale)
+        os.replace(tmp_path, EMBEDDINGS_PATH)
+
+        with closing(open_cache_db()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO similar_tickets (row, model, issue_type, content) VALUES (?, ?, ?, ?)",
+                (row, model, issue_type, test_cases)
+            )
+
+
+def build_test_case_prompt(ticket_details):
+    """Build the test case generation prompt for a ticket"""
+    components_str = ", ".join(ticket_details['components']) if ticket_details['components'] else "No components"
+
+    return TEST_CASE_PROMPT.substitute(
+        key=ticket_details['key'],
+        summary=ticket_details['summary'],
+        description=ticket_details['description'],
+        issue_type=ticket_details['issue_type'],
+        priority=ticket_details['priority'],
+        components=components_str,
+        acceptance_criteria=ticket_details['acceptance_criteria']
+    )
+
+
+def build_messages(prompt):
+    """Chat messages sent to OpenAI for a test case prompt"""
+    return [
+        {"role": "system", "content": SYSTEM_MESSAGE},
+        {"role": "user", "content": prompt}
+    ]
+
+
+@cache_completion
+async def request_completion(client, model, prompt, placeholder=None):
+    """Stream the completion for a prompt from the OpenAI Chat API, rendering it into placeholder as it arrives"""
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=build_messages(prompt),
+        stream=True
+    )
+
+    content = ""
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            content += chunk.choices[0].delta.content
+            if placeholder is not None:
+                placeholder.markdown(content)
+
+    return content
+
+
+def _notify(level, message):
+    """Show a message in the app, e.g. _notify("error", "...")"""
+    getattr(st, level)(message)
+
+
+async def generate_test_cases_async(client, ticket_details, model="gpt-3.5-turbo", placeholder=None,
+                                    notify=_notify):
+    """Generate test cases from ticket details with an AsyncOpenAI client
+
+    Warnings and errors are passed to notify, which shows them in the app unless replaced.
+    """
+    # Create an enhanced prompt
+    prompt = build_test_case_prompt(ticket_details)
+
+    # Exact repeats are served by the completion cache; otherwise look for a near-duplicate ticket
+    embedding = None
+    if load_cached_completion(completion_cache_key(model, prompt)) is None:
+        try:
+            embedding = await embed_ticket(client, ticket_details)
+            similar = find_similar_test_cases(embedding, model, ticket_details['issue_type'])
+            if similar:
+                return similar
+        except Exception as e:
+            notify("warning", f"Similar ticket lookup failed, generating from scratch: {str(e)}")
+
+    try:
+        test_cases = await request_completion(client, model, prompt, placeholder)
     except Exception as e:
-        st.error(f"Error fetching ticket details: {str(e)}")
+        notify("error", f"Error generating test cases: {str(e)}")
         return None
 
+    if test_cases and embedding is not None:
+        try:
+            remember_similar_test_cases(embedding, model, ticket_details['issue_type'], test_cases)
+        except Exception as e:
+            notify("warning", f"Could not update the similar ticket cache: {str(e)}")
+
+    return test_cases
+
 
-def generate_test_cases(ticket_details, openai_api_key, model="gpt-3.5-turbo"):
-    """Generate test cases from ticket details using OpenAI API"""
+def generate_test_cases(ticket_details, openai_api_key, model="gpt-3.5-turbo", placeholder=None):
+    """Generate test cases from ticket details using OpenAI API
+
+    If a placeholder element is given, the test cases are streamed into it while being generated.
+    """
     if not openai_api_key:
         st.error("OpenAI API key is required in the sidebar")
         return None
 
+    async def run():
+        async with _async_openai_client(openai_api_key) as client:
+            return await generate_test_cases_async(client, ticket_details, model, placeholder)
+
+    return asyncio.run(run())
+
+
+def _run_batch(batch, scope, tickets, openai_api_key, model="gpt-3.5-turbo", jira=None, ac_field_id=None):
+    """Generate test cases for several tickets concurrently, recording progress in batch
+
+    Runs on a background thread, so results and messages go into the shared batch record
+    under its lock instead of straight to Streamlit. When a Jira client is given, tickets are
+    issue keys; each one is fetched from Jira on the same event loop right before its test
+    cases are generated, so Jira and OpenAI waits overlap.
+    """
+    def notify(level, message):
+        with batch['lock']:
+            batch['messages'].append((level, message))
+
+    async def run():
+        semaphore = asyncio.Semaphore(BATCH_MAX_WORKERS)
+
+        async with _async_openai_client(openai_api_key) as client, \
+                (_jira_async_http(jira) if jira else nullcontext()) as http:
+            async def generate(ticket):
+                async with semaphore:
+                    if http is not None:
+                        issue_key = ticket
+                        try:
+                            ticket = await fetch_ticket_details_async(http, issue_key, ac_field_id)
+                        except Exception as e:
+                            notify("error", f"Error fetching ticket details for {issue_key}: {str(e)}")
+                            return issue_key, None
+                    return ticket['key'], await generate_test_cases_async(client, ticket, model, notify=notify)
+
+            for result in asyncio.as_completed([generate(ticket) for ticket in tickets]):
+                ticket_key, test_cases = await result
+                if test_cases:
+                    save_generated_test_cases(scope, ticket_key, test_cases)
+
+                with batch['lock']:
+                    if test_cases:
+                        batch['results'][ticket_key] = test_cases
+                    batch['done'] += 1
+                    batch['current'] = ticket_key
+
     try:
-        client = openai.OpenAI(api_key=openai_api_key)
+        asyncio.run(run())
     except Exception as e:
-        st.error(f"Error initializing OpenAI client: {str(e)}")
+        notify("error", f"Error processing batch: {str(e)}")
+    finally:
+        with batch['lock']:
+            batch['finished'] = True
+
+
+def start_batch(tickets, openai_api_key, model="gpt-3.5-turbo", jira=None, ac_field_id=None):
+    """Generate test cases for several tickets on a background thread
+
+    Progress is kept in st.session_state.batch_progress and repainted by show_batch_progress,
+    so finishing a ticket does not rerun the whole app.
+    """
+    batch = {
+        'lock': threading.Lock(),
+        'total': len(tickets),
+        'done': 0,
+        'current': None,
+        'results': {},
+        'messages': [],
+        'finished': False
+    }
+    st.session_state.batch_progress = batch
+    st.session_state.last_batch_summary = []
+
+    # Read from the session here, since the worker thread has no access to it
+    scope = test_cases_scope(manual=jira is None)
+    threading.Thread(target=_run_batch, args=(batch, scope, tickets, openai_api_key, model, jira, ac_field_id),
+                     daemon=True).start()
+
+
+@st.fragment(run_every=BATCH_POLL_INTERVAL)
+def show_batch_progress():
+    """Repaint the progress of the running batch without rerunning the rest of the app"""
+    batch = st.session_state.batch_progress
+    with batch['lock']:
+        done, total, current, finished = batch['done'], batch['total'], batch['current'], batch['finished']
+
+    st.progress(done / total)
+    st.text(f"Processed {current} ({done}/{total})" if current else "Starting batch...")
+
+    if finished:
+        # Rerun the whole app once to show the results and stop polling
+        st.rerun()
+
+
+def finish_batch():
+    """Merge a finished batch into the session and report its messages, once"""
+    batch = st.session_state.batch_progress
+    st.session_state.batch_progress = None
+    st.session_state.generated_test_cases.update(batch['results'])
+
+    for level, message in batch['messages']:
+        _notify(level, message)
+    st.success(f"Generated test cases for {len(batch['results'])} tickets")
+
+    st.session_state.last_batch_summary = list(batch['results'])
+
+
+def show_batch_results():
+    """Show the test cases of the tickets in the last finished batch or collected Batch API jobs"""
+    st.subheader("Generated Test Cases Summary")
+    for key in st.session_state.last_batch_summary:
+        # Read from the session so tickets regenerated since the batch show their latest test cases
+        if key in st.session_state.generated_test_cases:
+            with st.expander(f"Test Cases for {key}"):
+                st.markdown(st.session_state.generated_test_cases[key])
+
+
+def submit_batch_job(tickets, openai_api_key, model="gpt-3.5-turbo", scope=("", "")):
+    """Submit uncached tickets as a single OpenAI Batch API job
+
+    Tickets whose prompt is already cached are filled in immediately. Returns the
+    job record to poll later, or None if nothing needed to be submitted. Test cases
+    are stored under scope, a (jira_server, jira_email) pair.
+    """
+    batch_requests = []
+    cache_keys = {}
+
+    for ticket in tickets:
+        prompt = build_test_case_prompt(ticket)
+        key = completion_cache_key(model, prompt)
+
+        cached = load_cached_completion(key)
+        if cached is not None:
+            store_test_cases(ticket['key'], cached, scope)
+        elif ticket['key'] not in cache_keys:
+            cache_keys[ticket['key']] = key
+            batch_requests.append({
+                "custom_id": ticket['key'],
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {"model": model, "messages": build_messages(prompt)}
+            })
+
+    if not batch_requests:
         return None
 
-    # Create an enhanced prompt
-    components_str = ", ".join(ticket_details['components']) if ticket_details['components'] else "No components"
+    client = _openai_client(openai_api_key)
+    batch_input = "\n".join(json.dumps(request) for request in batch_requests).encode()
+    batch_file = client.files.create(file=("test_cases_batch.jsonl", batch_input), purpose="batch")
+    batch = client.batches.create(input_file_id=batch_file.id, endpoint="/v1/chat/completions",
+                                  completion_window="24h")
 
-    prompt = f"""
-    You are an expert QA engineer. Based on the following Jira ticket details, generate a comprehensive set of test cases.
-
-    TICKET KEY: {ticket_details['key']}
-    SUMMARY: {ticket_details['summary']}
-    DESCRIPTION: {ticket_details['description']}
-    ISSUE TYPE: {ticket_details['issue_type']}
-    PRIORITY: {ticket_details['priority']}
-    COMPONENTS: {components_str}
-    ACCEPTANCE CRITERIA: {ticket_details['acceptance_criteria']}
-
-    For each test case, provide:
-    1. Test case ID (TC-XX format)
-    2. Test objective
-    3. Preconditions
-    4. Test steps (numbered)
-    5. Expected results
-    6. Priority (High/Medium/Low)
-
-    Cover the following:
-    - Positive test cases (valid inputs/scenarios)
-    - Negative test cases (invalid inputs/error handling)
-    - Edge cases and boundary values
-    - Performance considerations (if applicable)
-    - Security aspects (if applicable)
-    - Integration points with other components
-
-    Format the test cases clearly with proper categorization using markdown.
+    return {'id': batch.id, 'model': model, 'cache_keys': cache_keys, 'status': batch.status, 'scope': scope,
+            'key_hash': openai_key_hash(openai_api_key)}
+
+
+def collect_batch_job(job, openai_api_key):
+    """Refresh a Batch API job and store its test cases once it has completed
+
+    Returns the keys of the tickets whose test cases were collected.
     """
+    client = _openai_client(openai_api_key)
+    batch = client.batches.retrieve(job['id'])
+    job['status'] = batch.status
 
-    try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system",
-                 "content": "You are a QA expert specialized in creating comprehensive test cases from Jira tickets."},
-                {"role": "user", "content": prompt}
-            ]
-        )
+    if batch.status != "completed" or not batch.output_file_id:
+        return []
+
+    collected = []
+    output = client.files.content(batch.output_file_id).text
+
+    for line in output.splitlines():
+        result = json.loads(line)
+        response = result.get('response')
+        if not response or response['status_code'] != 200:
+            continue
+
+        ticket_key = result['custom_id']
+        test_cases = response['body']['choices'][0]['message']['content']
+        save_cached_completion(job['cache_keys'][ticket_key], job['model'], test_cases)
+        store_test_cases(ticket_key, test_cases, job['scope'])
+        collected.append(ticket_key)
+
+    return collected
+
+
+def process_batch(tickets, openai_api_key, model="gpt-3.5-turbo", use_batch_api=False, jira=None, ac_field_id=None):
+    """Generate test cases for a list of tickets, either right away or through the Batch API
 
-        return response.choices[0].message.content
+    When a Jira client is given, tickets are issue keys to fetch from Jira first.
+    """
+    if not use_batch_api:
+        start_batch(tickets, openai_api_key, model, jira, ac_field_id)
+        return
+
+    if jira:
+        with st.spinner("Fetching ticket details..."):
+            tickets = get_ticket_details_concurrently(jira, tickets, ac_field_id)
+
+    try:
+        job = submit_batch_job(tickets, openai_api_key, model, test_cases_scope(manual=jira is None))
     except Exception as e:
-        st.error(f"Error generating test cases: {str(e)}")
-        return None
+        st.error(f"Error submitting batch job: {str(e)}")
+        return
+
+    if job:
+        st.session_state.batch_jobs.append(job)
+        save_batch_job(job)
+        st.success(f"Submitted batch job {job['id']} for {len(job['cache_keys'])} tickets. "
+                   "Check its status below.")
+    else:
+        st.success("All selected tickets already had cached test cases")
 
 
 def save_test_cases_to_jira(jira, ticket_key, test_cases):
@@ -232,6 +985,17 @@ def save_test_cases_to_jira(jira, ticket_key, test_cases):
         return False
 
 
+# Previously generated test cases are restored from disk for the Jira connection in the sidebar
+if st.session_state.get('test_cases_scope') != (jira_url, jira_email):
+    st.session_state.test_cases_scope = (jira_url, jira_email)
+    st.session_state.generated_test_cases = load_generated_test_cases(jira_url, jira_email)
+
+# Batch API jobs are restored too, so results submitted before a restart are still collected;
+# only jobs submitted with the OpenAI key in the sidebar can be retrieved with it
+if st.session_state.get('batch_jobs_key_hash') != openai_key_hash(openai_api_key):
+    st.session_state.batch_jobs_key_hash = openai_key_hash(openai_api_key)
+    st.session_state.batch_jobs = load_batch_jobs(st.session_state.batch_jobs_key_hash)
+
 # Main interface
 tab1, tab2, tab3, tab4 = st.tabs(["Getting Started", "Fetch Tickets", "Generate Test Cases", "Batch Processing"])
 
@@ -285,14 +1049,12 @@ with tab1:
     with col2:
         st.write("Jira Connection:")
         if all([jira_url, jira_email, jira_api_token, jira_project]):
-            try:
-                jira = connect_to_jira(jira_url, jira_email, jira_api_token)
-                if jira:
-                    st.success("Ready to connect")
-                else:
-                    st.error("Connection details provided but connection failed")
-            except:
-                st.error("Connection failed")
+            if not JIRA_AVAILABLE:
+                st.error("The 'jira' package is not installed")
+            elif _jira_ready(jira_url, jira_email, jira_api_token):
+                st.success("Ready to connect")
+            else:
+                st.error("Connection details provided but connection failed")
         else:
             st.error("Connection details incomplete")
 
@@ -307,7 +1069,7 @@ with tab2:
         status_filter = st.selectbox("Filter by Status", status_options, index=0)
 
     with col2:
-        max_results = st.number_input("Maximum Tickets", min_value=1, max_value=100, value=20)
+        max_results = st.number_input("Maximum Tickets", min_value=1, max_value=1000, value=20)
 
     if st.button("Fetch Tickets"):
         if not JIRA_AVAILABLE:
@@ -324,26 +1086,14 @@ with tab2:
 
                     if tickets:
                         st.session_state.fetched_tickets = tickets
+                        st.session_state.tickets_df = build_tickets_dataframe(tickets)
                         st.success(f"Fetched {len(tickets)} tickets")
                     else:
                         st.warning("No tickets found matching the criteria")
 
-    # Display fetched tickets
-    if st.session_state.fetched_tickets:
-        ticket_data = []
-
-        for issue in st.session_state.fetched_tickets:
-            ticket_data.append({
-                "Key": issue.key,
-                "Summary": issue.fields.summary,
-                "Type": issue.fields.issuetype.name,
-                "Status": issue.fields.status.name,
-                "Priority": issue.fields.priority.name if hasattr(issue.fields,
-                                                                  'priority') and issue.fields.priority else "Not set"
-            })
-
-        df = pd.DataFrame(ticket_data)
-        st.dataframe(df, use_container_width=True)
+    # Display fetched tickets; the table is built once per fetch rather than on every rerun
+    if st.session_state.tickets_df is not None:
+        st.dataframe(st.session_state.tickets_df, use_container_width=True)
     else:
         st.info("No tickets fetched yet. Click 'Fetch Tickets' to retrieve tickets from Jira.")
 
@@ -371,11 +1121,14 @@ with tab3:
                 st.error("Please provide OpenAI API key in the sidebar")
             else:
                 with st.spinner("Generating test cases..."):
-                    test_cases = generate_test_cases(manual_ticket, openai_api_key, ai_model)
+                    # Stream the test cases in while they generate; the full result is shown below
+                    stream_placeholder = st.empty()
+                    test_cases = generate_test_cases(manual_ticket, openai_api_key, ai_model, stream_placeholder)
+                    stream_placeholder.empty()
 
                     if test_cases:
                         ticket_key = manual_ticket['key']
-                        st.session_state.generated_test_cases[ticket_key] = test_cases
+                        store_test_cases(ticket_key, test_cases, test_cases_scope(manual=True))
                         st.success("Test cases generated successfully!")
     else:
         # Option to enter ticket key manually or select from fetched tickets
@@ -406,7 +1159,8 @@ with tab3:
 
                     if jira:
                         with st.spinner("Fetching ticket details..."):
-                            ticket_details = get_ticket_details(jira, ticket_key)
+                            ac_field_id = find_acceptance_criteria_field(jira_url, jira_email, jira_api_token)
+                            ticket_details = get_ticket_details(jira, ticket_key, ac_field_id)
 
                         if ticket_details:
                             st.subheader("Ticket Details")
@@ -422,10 +1176,14 @@ with tab3:
                                 st.write(f"**Acceptance Criteria:** {ticket_details['acceptance_criteria']}")
 
                             with st.spinner("Generating test cases..."):
-                                test_cases = generate_test_cases(ticket_details, openai_api_key, ai_model)
+                                # Stream the test cases in while they generate; the full result is shown below
+                                stream_placeholder = st.empty()
+                                test_cases = generate_test_cases(ticket_details, openai_api_key, ai_model,
+                                                                 stream_placeholder)
+                                stream_placeholder.empty()
 
                                 if test_cases:
-                                    st.session_state.generated_test_cases[ticket_key] = test_cases
+                                    store_test_cases(ticket_key, test_cases, test_cases_scope())
                                     st.success("Test cases generated successfully!")
 
     # Display generated test cases if available
@@ -468,49 +1226,30 @@ with tab4:
     # Option for working without Jira
     use_manual_batch = st.checkbox("Work without Jira connection (manual batch input)")
 
+    processing_mode = st.radio("Processing Mode", ["Generate now", "OpenAI Batch API (lower cost, results within 24h)"],
+                               horizontal=True)
+    use_batch_api = processing_mode != "Generate now"
+    batch_running = bool(st.session_state.batch_progress) and not st.session_state.batch_progress['finished']
+
     if use_manual_batch:
         st.write("Enter multiple ticket descriptions, one per line:")
         batch_descriptions = st.text_area("Each line should contain: TicketID | Summary | Description",
                                           height=200,
                                           help="Format: TICKET-123 | Add login feature | The user should be able to login...")
 
-        if st.button("Generate Test Cases for Batch"):
+        if st.button("Generate Test Cases for Batch", disabled=batch_running):
             if not openai_api_key:
                 st.error("Please provide OpenAI API key in the sidebar")
             elif not batch_descriptions:
                 st.error("Please enter at least one ticket description")
             else:
-                lines = batch_descriptions.strip().split('\n')
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-
-                for i, line in enumerate(lines):
-                    parts = line.split('|')
-                    if len(parts) >= 3:
-                        ticket_key = parts[0].strip()
-                        summary = parts[1].strip()
-                        description = parts[2].strip()
-
-                        status_text.text(f"Processing {ticket_key} ({i + 1}/{len(lines)})")
-
-                        manual_ticket = {
-                            'key': ticket_key,
-                            'summary': summary,
-                            'description': description,
-                            'issue_type': "Story",
-                            'priority': "Medium",
-                            'components': [],
-                            'acceptance_criteria': "Not provided"
-                        }
-
-                        test_cases = generate_test_cases(manual_ticket, openai_api_key, ai_model)
-                        if test_cases:
-                            st.session_state.generated_test_cases[ticket_key] = test_cases
-
-                    progress_bar.progress((i + 1) / len(lines))
-
-                status_text.text("All tickets processed!")
-                st.success(f"Generated test cases for {len(lines)} tickets")
+                tickets = parse_batch_descriptions(batch_descriptions)
+
+                if tickets:
+                    process_batch(tickets, openai_api_key, ai_model, use_batch_api)
+                else:
+                    st.error("No valid lines found. Each line needs a ticket ID, summary and description "
+                             "separated by '|'")
     else:
         st.info("This feature allows you to generate test cases for multiple tickets at once.")
 
@@ -519,27 +1258,21 @@ with tab4:
         else:
             # Allow selection of multiple tickets
             ticket_options = {issue.key: issue.fields.summary for issue in st.session_state.fetched_tickets}
-            selected_tickets = []
-
-            st.write("Select tickets for batch processing:")
-
-            col1, col2 = st.columns([1, 2])
 
-            with col1:
-                select_all = st.checkbox("Select All Tickets")
+            select_all = st.checkbox("Select All Tickets")
 
             if select_all:
                 selected_tickets = list(ticket_options.keys())
                 st.info(f"Selected all {len(selected_tickets)} tickets")
             else:
-                for key, summary in ticket_options.items():
-                    if st.checkbox(f"{key}: {summary}", key=f"select_{key}"):
-                        selected_tickets.append(key)
+                # A single widget keeps reruns cheap however many tickets were fetched
+                selected_tickets = st.multiselect("Select tickets for batch processing:", list(ticket_options.keys()),
+                                                  format_func=lambda key: f"{key}: {ticket_options[key]}")
 
             if selected_tickets:
                 st.write(f"Selected {len(selected_tickets)} tickets")
 
-                if st.button("Generate Test Cases for All Selected"):
+                if st.button("Generate Test Cases for All Selected", disabled=batch_running):
                     if not openai_api_key:
                         st.error("Please provide OpenAI API key in the sidebar")
                     elif not all([jira_url, jira_email, jira_api_token]):
@@ -548,30 +1281,55 @@ with tab4:
                         jira = connect_to_jira(jira_url, jira_email, jira_api_token)
 
                         if jira:
-                            progress_bar = st.progress(0)
-                            status_text = st.empty()
+                            ac_field_id = find_acceptance_criteria_field(jira_url, jira_email, jira_api_token)
+                            process_batch(selected_tickets, openai_api_key, ai_model, use_batch_api, jira, ac_field_id)
 
-                            for i, ticket_key in enumerate(selected_tickets):
-                                status_text.text(f"Processing {ticket_key} ({i + 1}/{len(selected_tickets)})")
+    # Batches generating now run in the background; only their progress is repainted
+    if st.session_state.batch_progress:
+        if st.session_state.batch_progress['finished']:
+            finish_batch()
+        else:
+            show_batch_progress()
 
-                                ticket_details = get_ticket_details(jira, ticket_key)
-                                if ticket_details:
-                                    test_cases = generate_test_cases(ticket_details, openai_api_key, ai_model)
-                                    if test_cases:
-                                        st.session_state.generated_test_cases[ticket_key] = test_cases
+    # Poll Batch API jobs that have not been collected yet
+    if st.session_state.batch_jobs:
+        st.subheader("Batch Jobs")
 
-                                progress_bar.progress((i + 1) / len(selected_tickets))
+        for job in st.session_state.batch_jobs:
+            st.write(f"**{job['id']}** ({len(job['cache_keys'])} tickets): {job['status']}")
 
-                            status_text.text("All tickets processed!")
-                            st.success(f"Generated test cases for {len(selected_tickets)} tickets")
+        if st.button("Check Batch Job Status"):
+            if not openai_api_key:
+                st.error("Please provide OpenAI API key in the sidebar")
+            else:
+                for job in list(st.session_state.batch_jobs):
+                    try:
+                        collected = collect_batch_job(job, openai_api_key)
+                    except openai.NotFoundError:
+                        # The job no longer exists on OpenAI, so it can never be collected
+                        st.session_state.batch_jobs.remove(job)
+                        delete_batch_job(job['id'])
+                        st.warning(f"Batch job {job['id']} was not found and has been removed")
+                        continue
+                    except Exception as e:
+                        st.error(f"Error checking batch job {job['id']}: {str(e)}")
+                        continue
+
+                    if job['status'] in ("completed", "failed", "expired", "cancelled"):
+                        st.session_state.batch_jobs.remove(job)
+                        delete_batch_job(job['id'])
+                        st.session_state.last_batch_summary = list(
+                            dict.fromkeys(st.session_state.last_batch_summary + collected))
+                        st.info(f"Batch job {job['id']} {job['status']}: collected test cases for "
+                                f"{len(collected)} tickets")
+                    else:
+                        save_batch_job(job)
+                        st.info(f"Batch job {job['id']} is {job['status']}")
 
-                            # Show results summary
-                            st.subheader("Generated Test Cases Summary")
-                            for key in selected_tickets:
-                                if key in st.session_state.generated_test_cases:
-                                    with st.expander(f"Test Cases for {key}"):
-                                        st.markdown(st.session_state.generated_test_cases[key])
+    # Shown after polling so test cases collected from the Batch API appear right away
+    if st.session_state.last_batch_summary:
+        show_batch_results()
 
 # Footer
 st.markdown("---")
-st.caption("AI Test Case Generator - Streamlining the QA process with AI")
\ No newline at end of file
+st.caption("AI Test Case Generator - Streamlining the QA process with AI")
\ No newline at end of file